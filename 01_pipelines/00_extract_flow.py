@@ -9,10 +9,11 @@ python flows/extract_flow.py --base-dir /tmp/data    # custom location
 from __future__ import annotations
 from pathlib import Path
 from datetime import datetime
-import argparse, io, zipfile, urllib.request
+import argparse, io, os, zipfile, urllib.request
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from prefect import flow, task, get_run_logger
+from passcompass_utils.instrumentation import timed, flow_spans
 
 # ────────────────────────────────────────────────────────────────────────────
 # Defaults ───────────────────────────────────────────────────────────────────
@@ -26,6 +27,7 @@ BASE_DIR = (
 # ────────────────────────────────────────────────────────────────────────────
 # TASKS ──────────────────────────────────────────────────────────────────────
 @task(retries=4, retry_delay_seconds=30, log_prints=True)
+@timed
 def download_and_extract(url: str, base_dir: str) -> Path:
     """Download the zip and extract everything into a timestamped folder."""
     ts_dir = Path(base_dir) / datetime.utcnow().strftime("%Y_%m_%d")
@@ -50,6 +52,7 @@ def download_and_extract(url: str, base_dir: str) -> Path:
 
 
 @task(log_prints=True)
+@timed
 def treat_data(dir_path: Path) -> Path:
     """Combine math & Portuguese datasets and engineer the target."""
     math_df = pd.read_csv(dir_path / "student-mat.csv", sep=";")
@@ -73,6 +76,7 @@ def treat_data(dir_path: Path) -> Path:
 
 
 @task(log_prints=True)
+@timed
 def split_train_test(data_path: Path, test_size: float = 0.2, seed: int = 42):
     df = pd.read_parquet(data_path)
     train, test = train_test_split(df, test_size=test_size, random_state=seed)
@@ -85,6 +89,7 @@ def split_train_test(data_path: Path, test_size: float = 0.2, seed: int = 42):
 
 
 @task(log_prints=True)
+@timed
 def basic_stats(train_path: Path):
     df = pd.read_parquet(train_path)
     pass_rate = df["pass"].mean()
@@ -104,11 +109,17 @@ def basic_stats(train_path: Path):
 @flow(name="extract_flow", log_prints=True)
 def extract_flow(url: str = UCI_URL, base_dir: str = BASE_DIR):
 
-
-    data_dir      = download_and_extract(url, base_dir)     # 1
-    cleaned_path  = treat_data(data_dir)                    # 2
-    train_path, _ = split_train_test(cleaned_path)          # 3
-    basic_stats(train_path)                                 # 4
+    # task timings go to MLflow only when tracking is configured, so plain
+    # extract runs never pay the mlflow import; otherwise they are dropped
+    with flow_spans(
+        log_to_mlflow=bool(os.getenv("MLFLOW_TRACKING_URI")),
+        experiment_name="extract_flow",
+        run_name="extract_flow",
+    ):
+        data_dir      = download_and_extract(url, base_dir)     # 1
+        cleaned_path  = treat_data(data_dir)                    # 2
+        train_path, _ = split_train_test(cleaned_path)          # 3
+        basic_stats(train_path)                                 # 4
 
 
 # ────────────────────────────────────────────────────────────────────────────
@@ -5,6 +5,7 @@ from sklearn.pipeline import Pipeline
 from sklearn.feature_extraction import DictVectorizer
 from sklearn.linear_model import LogisticRegression
 from passcompass_utils.metrics import log_classification_report
+from passcompass_utils.instrumentation import timed, flow_spans
 from pathlib import Path
 
 
@@ -14,15 +15,19 @@ os.environ["PREFECT_API_URL"] = "http://127.0.0.1:4200/api"
 # optional – silence the telemetry SSL warning
 os.environ["PREFECT_SEND_ANONYMOUS_TELEMETRY"] = "0"
 
+MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://127.0.0.1:5000")
+
 BASE_DIR = Path(__file__).resolve().parents[1]      # project root
 CSV_PATH = BASE_DIR / "data" / "students" / "students_train.csv"
 
 @task
+@timed
 def download_data() -> Path:
     """Return path to fresh CSV (already downloaded in repo)."""
     return CSV_PATH
 
 @task
+@timed
 def preprocess(csv_path: pathlib.Path):
     df = pd.read_csv(csv_path)
     y  = df.pop("pass")
@@ -30,6 +35,7 @@ def preprocess(csv_path: pathlib.Path):
     return train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
 
 @task
+@timed
 def train_model(split):
     X_tr, X_val, y_tr, y_val = split
     pipe = Pipeline([
@@ -40,6 +46,7 @@ def train_model(split):
     return pipe, X_val, y_val
 
 @task
+@timed
 def evaluate(pipe_tuple):
     pipe, X_val, y_val = pipe_tuple
     y_pred = pipe.predict(X_val)
@@ -48,9 +55,10 @@ def evaluate(pipe_tuple):
     return log["val_accuracy"], pipe        # pick key metric to bubble up
 
 @task
+@timed
 def register(pipe, metric):
-    mlflow.set_tracking_uri("http://127.0.0.1:5000")
-    with mlflow.start_run():
+    # child of the flow-level run, so the model artifact lives under it
+    with mlflow.start_run(nested=True):
         mlflow.set_tag("model_type", "LogReg")
         mlflow.log_metric("val_accuracy", metric)
         mlflow.sklearn.log_model(pipe, "model")
@@ -58,10 +66,13 @@ def register(pipe, metric):
 
 @flow(name="train_student_model")
 def main_flow():
-    csv_path = download_data()
-    split    = preprocess(csv_path)
-    metric, pipe = evaluate(train_model(split))
-    register(pipe, metric)
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    # flow-level run: holds the task timing spans, register() nests under it
+    with mlflow.start_run(run_name="train_student_model"), flow_spans():
+        csv_path = download_data()
+        split    = preprocess(csv_path)
+        metric, pipe = evaluate(train_model(split))
+        register(pipe, metric)
 
 if __name__ == "__main__":
     main_flow()
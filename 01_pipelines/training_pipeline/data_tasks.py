@@ -3,12 +3,15 @@ import pandas as pd
 from sklearn.feature_extraction import DictVectorizer
 from sklearn.model_selection import train_test_split
 from prefect import task
+from passcompass_utils.instrumentation import timed
 
 @task
+@timed
 def load_data(path: str | Path):
     return pd.read_parquet(path)
 
 @task
+@timed
 def vectorize(df, target_col: str = "pass"):
     """
     Returns X_train, X_val, y_train, y_val, DictVectorizer
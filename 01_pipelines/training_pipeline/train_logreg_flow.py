@@ -1,13 +1,16 @@
+import mlflow
 from prefect import flow
 from hyperopt import hp, loguniform
 
 from sklearn.linear_model import LogisticRegression
 from data_tasks import load_data, vectorize
 from train_utils import run_hpo
+from passcompass_utils.instrumentation import flow_spans
 
 # ─── you will overwrite this from Prefect CLI or env var ──────────────
 ACC_MIN = 0.78          #  ←  set later!
 MAX_EVALS = 25
+EXPERIMENT_NAME = "MLflow-training"
 # ----------------------------------------------------------------------
 
 @flow(name="train_logreg_flow")
@@ -15,25 +18,28 @@ def train_logreg_flow(
     data_path: str = "data/train.parquet",
     acc_min: float = ACC_MIN,
 ):
-    df = load_data(data_path)
-    X_train, X_val, y_train, y_val, dv = vectorize(df)
+    # parent run: holds the task timing spans, HPO trials nest under it
+    mlflow.set_experiment(EXPERIMENT_NAME)
+    with mlflow.start_run(run_name="train_logreg_flow"), flow_spans():
+        df = load_data(data_path)
+        X_train, X_val, y_train, y_val, dv = vectorize(df)
 
-    search_space = {
-        "C":          loguniform("C", -7, 4),    #  e^(−7)…e^(4)
-        "penalty":    hp.choice("penalty", ["l1", "l2"]),
-        "class_weight": hp.choice("cw", [None, "balanced"]),
-        "solver": "liblinear",
-        "max_iter": 500,
-    }
+        search_space = {
+            "C":          loguniform("C", -7, 4),    #  e^(−7)…e^(4)
+            "penalty":    hp.choice("penalty", ["l1", "l2"]),
+            "class_weight": hp.choice("cw", [None, "balanced"]),
+            "solver": "liblinear",
+            "max_iter": 500,
+        }
 
-    best = run_hpo(
-        LogisticRegression,
-        search_space,
-        X_train, y_train, X_val, y_val,
-        dv,
-        experiment_name="MLflow-training",
-        tag_name="logreg",
-        acc_min=acc_min,
-        max_evals=MAX_EVALS,
-    )
+        best = run_hpo(
+            LogisticRegression,
+            search_space,
+            X_train, y_train, X_val, y_val,
+            dv,
+            experiment_name=EXPERIMENT_NAME,
+            tag_name="logreg",
+            acc_min=acc_min,
+            max_evals=MAX_EVALS,
+        )
     print("✔️  Best params:", best)
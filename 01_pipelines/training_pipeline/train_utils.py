@@ -5,6 +5,7 @@ from hyperopt import fmin, tpe, Trials, STATUS_OK
 from sklearn.metrics import accuracy_score, recall_score, precision_recall_curve
 
 from metrics import log_classification_report, evaluate_and_log  # <- your helpers
+from passcompass_utils.instrumentation import span
 
 
 def _best_threshold(y_true, prob_fail, acc_min):
@@ -44,6 +45,14 @@ def run_hpo(
     One Hyperopt loop that   (i) tunes hyper-parameters,
     (ii) tunes a decision threshold *after* training,
     (iii) logs only models whose tuned accuracy >= acc_min.
+
+    Each trial also logs wall / CPU time and memory of its phases
+    (fit, predict, threshold sweep, MLflow logging, model upload when one
+    is saved) as `phase_*` metrics, in a single request, plus the process
+    RSS high-water mark once as `trial_process_max_rss_mb`. Note that
+    `phase_*_rss_hwm_delta_mb` is the *growth* of that high-water mark, so
+    after the first trial it reads 0 for almost every phase; it is not a
+    per-phase peak (run with PASSCOMPASS_TRACE_MEMORY=1 for that).
     """
 
     mlflow.set_experiment(experiment_name)
@@ -51,44 +60,61 @@ def run_hpo(
     def objective(params):
         with mlflow.start_run(nested=True, tags={"model": tag_name}):
             # --------  train
-            model = model_cls(**params)
-            model.fit(X_train, y_train)
+            with span("fit", log_to_mlflow=False) as t_fit:
+                model = model_cls(**params)
+                model.fit(X_train, y_train)
 
             # --------  probability of *fail* (label 0)
-            idx_fail = list(model.classes_).index(0)
-            prob_fail = model.predict_proba(X_val)[:, idx_fail]
+            with span("predict", log_to_mlflow=False) as t_pred:
+                idx_fail = list(model.classes_).index(0)
+                prob_fail = model.predict_proba(X_val)[:, idx_fail]
 
             # --------  threshold sweep
-            thr, rec0, acc = _best_threshold(y_val, prob_fail, acc_min)
+            with span("threshold_sweep", log_to_mlflow=False) as t_thr:
+                thr, rec0, acc = _best_threshold(y_val, prob_fail, acc_min)
 
             # --------  log metrics
-            mlflow.log_param("threshold", thr)
-            mlflow.log_metrics({
-                "val_recall_fail_tuned": rec0,
-                "val_accuracy_tuned":    acc,
-            })
-
-            # full report (uses tuned threshold)
-            y_pred_tuned = (prob_fail >= thr).astype(int == 0)
-            log_classification_report(
-                y_val, y_pred_tuned, prefix="val_"
-            )
-
-            mlflow.log_params(params)
-            mlflow.log_param(
-                "num_features", len(dv.feature_names_)
-            )
-            mlflow.set_tag("feature_list",
-                           json.dumps(dv.feature_names_.tolist()))
+            with span("mlflow_log", log_to_mlflow=False) as t_log:
+                mlflow.log_param("threshold", thr)
+                mlflow.log_metrics({
+                    "val_recall_fail_tuned": rec0,
+                    "val_accuracy_tuned":    acc,
+                })
+
+                # full report (uses tuned threshold)
+                y_pred_tuned = (prob_fail >= thr).astype(int == 0)
+                log_classification_report(
+                    y_val, y_pred_tuned, prefix="val_"
+                )
+
+                mlflow.log_params(params)
+                mlflow.log_param(
+                    "num_features", len(dv.feature_names_)
+                )
+                mlflow.set_tag("feature_list",
+                               json.dumps(dv.feature_names_.tolist()))
+
+            phases = [t_fit, t_pred, t_thr, t_log]
 
             # --------  optionally save the model
             if acc >= acc_min:
-                mlflow.sklearn.log_model(
-                    model, "model",
-                    input_example=X_train[:1],
-                    registered_model_name=None,
-                    extra_pip_requirements=["scikit-learn"]
-                )
+                with span("log_model", log_to_mlflow=False) as t_model:
+                    mlflow.sklearn.log_model(
+                        model, "model",
+                        input_example=X_train[:1],
+                        registered_model_name=None,
+                        extra_pip_requirements=["scikit-learn"]
+                    )
+                phases.append(t_model)
+
+            # --------  phase timings, one request for all of them
+            phase_metrics = {
+                k: v
+                for t in phases for k, v in t.as_metrics("phase_").items()
+                if not k.endswith("_process_max_rss_mb")   # same value each phase
+            }
+            phase_metrics["trial_process_max_rss_mb"] = phases[-1].process_max_rss_mb
+            mlflow.log_metrics(phase_metrics)
 
             # Hyperopt tries to *minimise* → negative recall of fail class
             return {"loss": -rec0, "status": STATUS_OK}
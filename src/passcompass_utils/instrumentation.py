@@ -0,0 +1,293 @@
+"""
+Lightweight timing / memory spans for flows, tasks and HPO trials.
+
+Each span records wall time, CPU time and memory, logs a one-line summary
+and attaches the numbers as MLflow metrics: directly when an MLflow run is
+active in the current thread, otherwise they are buffered per Prefect flow
+run until the flow flushes them (see `flow_spans`).
+
+Limits: `cpu_s` is `time.process_time()`, i.e. CPU of the *whole process*,
+so under Prefect's thread-pool task runner (`.submit` / `.map`) or a
+threaded Flask server concurrent work is charged to whichever span is open.
+`thread_cpu_s` (`time.thread_time()`) only counts the span's own thread and
+is the number to trust for single-threaded tasks. Memory numbers are
+process-wide for the same reason: with concurrent spans, each one's
+`peak_mem_mb` includes what the other threads allocated meanwhile.
+"""
+
+from __future__ import annotations
+import collections, functools, logging, os, sys, threading, time, tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+try:                                    # not available on Windows
+    import resource
+except ImportError:                     # pragma: no cover
+    resource = None
+
+# tracemalloc gives a true per-span peak but slows allocation-heavy code
+# down noticeably, so it is opt-in. By default we report how much the
+# process RSS high-water mark grew during the span, which is free to read.
+TRACE_MEMORY = os.getenv("PASSCOMPASS_TRACE_MEMORY", "0") == "1"
+
+_log = logging.getLogger(__name__)
+
+# spans that closed without an active MLflow run, as
+# (flow_run_id, timestamp_ms, metrics), waiting for flush_spans()
+_pending: collections.deque = collections.deque(maxlen=10_000)
+_pending_lock = threading.Lock()
+
+# tracemalloc is process-wide, so open spans of *all* threads live here,
+# each as [peak_bytes_seen, baseline_bytes]
+_traced: list = []
+_trace_lock = threading.Lock()
+_trace_owned = False                    # True if we called tracemalloc.start()
+
+
+@dataclass
+class Span:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    thread_cpu_s: float = 0.0
+    rss_hwm_delta_mb: float = 0.0       # growth of the process RSS high-water mark
+    process_max_rss_mb: float = 0.0     # absolute process RSS high-water mark
+    peak_mem_mb: float | None = None    # per-span peak, only with TRACE_MEMORY
+
+    def as_metrics(self, prefix: str = "") -> dict:
+        key = f"{prefix}{self.name}"
+        metrics = {
+            f"{key}_wall_s":             self.wall_s,
+            f"{key}_cpu_s":              self.cpu_s,
+            f"{key}_thread_cpu_s":       self.thread_cpu_s,
+            f"{key}_rss_hwm_delta_mb":   self.rss_hwm_delta_mb,
+            f"{key}_process_max_rss_mb": self.process_max_rss_mb,
+        }
+        if self.peak_mem_mb is not None:
+            metrics[f"{key}_peak_mem_mb"] = self.peak_mem_mb
+        return metrics
+
+
+def _max_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return rss / 1024**2 if sys.platform == "darwin" else rss / 1024
+
+
+def _logger():
+    """Prefect's run logger inside a flow/task run, module logger otherwise."""
+    try:
+        from prefect import get_run_logger
+        return get_run_logger()
+    except Exception:
+        return _log
+
+
+def _active_mlflow():
+    """The mlflow module if a run is active in this thread, else None.
+
+    If nobody imported mlflow there can be no active run, so we never pay
+    its import cost here (the extract flow does not use MLflow at all).
+    """
+    mlflow = sys.modules.get("mlflow")
+    if mlflow is not None and mlflow.active_run():
+        return mlflow
+    return None
+
+
+def _flow_run_id() -> str | None:
+    """Id of the Prefect flow run we are in (also from its tasks), or None."""
+    try:
+        from prefect.runtime import flow_run
+        return flow_run.id
+    except Exception:
+        return None
+
+
+def _trace_start() -> list:
+    """Register a new traced span and return its [peak_seen, baseline] record."""
+    global _trace_owned
+    with _trace_lock:
+        if not _traced and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _trace_owned = True
+
+        current, peak = tracemalloc.get_traced_memory()
+        # reset_peak() below wipes the peak every open span (parents in this
+        # thread, spans in other threads) is measuring, so bank it first
+        for rec in _traced:
+            rec[0] = max(rec[0], peak)
+        tracemalloc.reset_peak()
+
+        rec = [current, current]
+        _traced.append(rec)
+        return rec
+
+
+def _trace_stop(s: Span, rec: list) -> None:
+    global _trace_owned
+    with _trace_lock:
+        peak = max(rec[0], tracemalloc.get_traced_memory()[1])
+        _traced[:] = [r for r in _traced if r is not rec]
+        s.peak_mem_mb = (peak - rec[1]) / 1024**2
+        # only the last open span stops tracing, and only if we started it
+        if not _traced and _trace_owned:
+            tracemalloc.stop()
+            _trace_owned = False
+
+
+@contextmanager
+def span(name: str, *, prefix: str = "", log_to_mlflow: bool = True) -> Iterator[Span]:
+    """
+    Time the enclosed block.
+
+        with span("fit"):
+            model.fit(X, y)
+
+    Metrics are named `{prefix}{name}_wall_s`, `_cpu_s`, `_thread_cpu_s`,
+    `_rss_hwm_delta_mb`, `_process_max_rss_mb` (and `_peak_mem_mb` with
+    PASSCOMPASS_TRACE_MEMORY=1). The yielded `Span` is filled in on exit,
+    so callers can pass `log_to_mlflow=False` and log the numbers
+    themselves.
+    """
+    s = Span(name)
+    trace_rec = _trace_start() if TRACE_MEMORY else None
+
+    rss0 = _max_rss_mb()
+    wall0, cpu0, tcpu0 = time.perf_counter(), time.process_time(), time.thread_time()
+    try:
+        yield s
+    finally:
+        s.wall_s       = time.perf_counter() - wall0
+        s.cpu_s        = time.process_time() - cpu0
+        s.thread_cpu_s = time.thread_time() - tcpu0
+        s.process_max_rss_mb = _max_rss_mb()
+        s.rss_hwm_delta_mb   = s.process_max_rss_mb - rss0
+
+        if trace_rec is not None:
+            _trace_stop(s, trace_rec)
+
+        _logger().info(
+            "span %s: wall=%.3fs cpu=%.3fs thread_cpu=%.3fs rss_hwm_delta=%.1fMB",
+            s.name, s.wall_s, s.cpu_s, s.thread_cpu_s, s.rss_hwm_delta_mb,
+        )
+
+        if log_to_mlflow:
+            metrics = s.as_metrics(prefix)
+            mlflow = _active_mlflow()
+            if mlflow is None:
+                entry = (_flow_run_id(), int(time.time() * 1000), metrics)
+                with _pending_lock:
+                    _pending.append(entry)
+            else:
+                try:
+                    mlflow.log_metrics(metrics)
+                except Exception as exc:    # never fail the real work over a metric
+                    _log.warning("could not log span %s to MLflow: %s", s.name, exc)
+
+
+def timed(fn: Callable | None = None, *, name: str | None = None, prefix: str = ""):
+    """
+    Decorator version of `span`. Put it *under* Prefect's `@task` so the
+    span covers the task body only:
+
+        @task
+        @timed
+        def treat_data(...): ...
+    """
+    def decorate(f):
+        span_name = name or f.__name__
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with span(span_name, prefix=prefix):
+                return f(*args, **kwargs)
+        return wrapper
+
+    return decorate(fn) if fn is not None else decorate
+
+
+def _take_pending(flow_run_id: str | None) -> list:
+    """Remove and return the buffered entries of one flow run."""
+    with _pending_lock:
+        taken = [e for e in _pending if e[0] == flow_run_id]
+        kept  = [e for e in _pending if e[0] != flow_run_id]
+        _pending.clear()
+        _pending.extend(kept)
+    return taken
+
+
+def drop_spans() -> int:
+    """Discard the current flow run's buffered spans; returns how many."""
+    return len(_take_pending(_flow_run_id()))
+
+
+def flush_spans(*, experiment_name: str | None = None, run_name: str | None = None) -> int:
+    """
+    Log the current flow run's buffered spans to MLflow in one batch.
+
+    They go to the active run or, without one, to a new run in
+    `experiment_name`. Repeated span names (e.g. a mapped task) are kept as
+    successive steps. MLflow errors are logged, not raised. Returns the
+    number of metrics logged.
+    """
+    pending = _take_pending(_flow_run_id())
+    if not pending:
+        return 0
+
+    try:
+        import mlflow
+        from mlflow.entities import Metric
+        from mlflow.tracking import MlflowClient
+
+        steps = collections.Counter()
+        batch = []
+        for _, ts, metrics in pending:
+            for k, v in metrics.items():
+                batch.append(Metric(k, v, ts, steps[k]))
+                steps[k] += 1
+
+        def _send(run_id):
+            client = MlflowClient()
+            for i in range(0, len(batch), 1000):    # log_batch caps at 1000 metrics
+                client.log_batch(run_id, metrics=batch[i:i + 1000])
+
+        run = mlflow.active_run()
+        if run:
+            _send(run.info.run_id)
+        else:
+            if experiment_name:
+                mlflow.set_experiment(experiment_name)
+            with mlflow.start_run(run_name=run_name) as run:
+                _send(run.info.run_id)
+    except Exception as exc:    # never fail the real work over a metric
+        _log.warning("could not flush %d spans to MLflow: %s", len(pending), exc)
+        return 0
+    return len(batch)
+
+
+@contextmanager
+def flow_spans(
+    *,
+    log_to_mlflow: bool = True,
+    experiment_name: str | None = None,
+    run_name: str | None = None,
+) -> Iterator[None]:
+    """
+    Scope a flow body: on exit (also on failure) flush this flow run's
+    buffered spans, or drop them when `log_to_mlflow` is False, so they
+    never leak into the next flow run of the same process.
+
+        with mlflow.start_run(), flow_spans():
+            ...
+    """
+    try:
+        yield
+    finally:
+        if log_to_mlflow:
+            flush_spans(experiment_name=experiment_name, run_name=run_name)
+        else:
+            drop_spans()
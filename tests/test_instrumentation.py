@@ -0,0 +1,188 @@
+import sys, threading, tracemalloc, types
+
+import pytest
+
+from passcompass_utils import instrumentation as ins
+from passcompass_utils.instrumentation import span, timed, flush_spans, flow_spans
+
+MB = 1024**2
+
+
+@pytest.fixture(autouse=True)
+def _clean(monkeypatch):
+    monkeypatch.setattr(ins, "TRACE_MEMORY", False)
+    monkeypatch.setattr(ins, "_flow_run_id", lambda: None)
+    ins._pending.clear()
+    yield
+    ins._pending.clear()
+
+
+@pytest.fixture
+def fake_mlflow(monkeypatch):
+    """Minimal mlflow stand-in recording log_batch calls."""
+    calls = types.SimpleNamespace(
+        batches=[], logged=[], experiment=None, runs=0, fail=False, active=None
+    )
+
+    class Client:
+        def log_batch(self, run_id, metrics):
+            if calls.fail:
+                raise ConnectionError("tracking server down")
+            calls.batches.append((run_id, metrics))
+
+    class _Run:
+        info = types.SimpleNamespace(run_id="new-run")
+        def __enter__(self):
+            calls.runs += 1
+            return self
+        def __exit__(self, *exc):
+            return False
+
+    mlflow = types.ModuleType("mlflow")
+    mlflow.active_run = lambda: calls.active
+    mlflow.log_metrics = calls.logged.append
+    mlflow.set_experiment = lambda name: setattr(calls, "experiment", name)
+    mlflow.start_run = lambda run_name=None: _Run()
+    entities = types.ModuleType("mlflow.entities")
+    entities.Metric = lambda key, value, timestamp, step: (key, value, step)
+    tracking = types.ModuleType("mlflow.tracking")
+    tracking.MlflowClient = Client
+
+    monkeypatch.setitem(sys.modules, "mlflow", mlflow)
+    monkeypatch.setitem(sys.modules, "mlflow.entities", entities)
+    monkeypatch.setitem(sys.modules, "mlflow.tracking", tracking)
+    return calls
+
+
+def test_span_metric_names():
+    with span("fit", prefix="phase_", log_to_mlflow=False) as s:
+        pass
+    assert set(s.as_metrics("phase_")) == {
+        "phase_fit_wall_s",
+        "phase_fit_cpu_s",
+        "phase_fit_thread_cpu_s",
+        "phase_fit_rss_hwm_delta_mb",
+        "phase_fit_process_max_rss_mb",
+    }
+    assert s.peak_mem_mb is None
+    assert s.wall_s >= 0 and s.rss_hwm_delta_mb >= 0
+
+
+def test_timed_keeps_name_and_result():
+    @timed
+    def treat_data(x):
+        return x * 2
+
+    assert treat_data(21) == 42
+    assert treat_data.__name__ == "treat_data"
+    (_, _, metrics), = ins._pending
+    assert "treat_data_wall_s" in metrics
+
+
+def test_nested_trace_peaks(monkeypatch):
+    monkeypatch.setattr(ins, "TRACE_MEMORY", True)
+    with span("outer", log_to_mlflow=False) as outer:
+        buf = bytearray(20 * MB)
+        with span("inner", log_to_mlflow=False) as inner:
+            pass
+        del buf
+    assert outer.peak_mem_mb >= 19
+    assert inner.peak_mem_mb < 1
+    assert not tracemalloc.is_tracing()
+
+
+def test_concurrent_trace_peaks(monkeypatch):
+    monkeypatch.setattr(ins, "TRACE_MEMORY", True)
+    a_open, b_open, a_closed = threading.Event(), threading.Event(), threading.Event()
+    result = {}
+
+    def thread_a():
+        with span("a", log_to_mlflow=False) as s:
+            a_open.set()
+            b_open.wait()
+        result["a"] = s
+        a_closed.set()
+
+    def thread_b():
+        a_open.wait()
+        with span("b", log_to_mlflow=False) as s:
+            b_open.set()
+            a_closed.wait()             # A closing must not stop tracing
+            result["tracing_after_a"] = tracemalloc.is_tracing()
+            buf = bytearray(5 * MB)
+            del buf
+        result["b"] = s
+
+    threads = [threading.Thread(target=thread_a), threading.Thread(target=thread_b)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert result["tracing_after_a"]
+    assert result["b"].peak_mem_mb >= 4.5
+    assert not tracemalloc.is_tracing()
+
+
+def test_span_logs_directly_with_active_run(fake_mlflow):
+    fake_mlflow.active = types.SimpleNamespace(info=types.SimpleNamespace(run_id="flow-run"))
+    with span("task"):
+        pass
+    (metrics,) = fake_mlflow.logged
+    assert "task_wall_s" in metrics
+    assert len(ins._pending) == 0
+
+
+def test_flush_without_active_run(fake_mlflow):
+    for _ in range(3):
+        with span("task"):
+            pass
+    assert len(ins._pending) == 3
+
+    assert flush_spans(experiment_name="extract_flow") == 15
+    assert fake_mlflow.experiment == "extract_flow"
+    assert fake_mlflow.runs == 1
+    (run_id, metrics), = fake_mlflow.batches
+    assert run_id == "new-run"
+    assert [step for key, _, step in metrics if key == "task_wall_s"] == [0, 1, 2]
+    assert flush_spans() == 0
+
+
+def test_flush_chunks_at_1000(fake_mlflow):
+    for _ in range(250):                # 5 metrics each
+        with span("task"):
+            pass
+    assert flush_spans() == 1250
+    assert [len(m) for _, m in fake_mlflow.batches] == [1000, 250]
+
+
+def test_flush_errors_are_swallowed(fake_mlflow):
+    fake_mlflow.fail = True
+    with span("task"):
+        pass
+    assert flush_spans() == 0
+    assert len(ins._pending) == 0
+
+
+def test_buffer_is_scoped_to_flow_run(fake_mlflow, monkeypatch):
+    monkeypatch.setattr(ins, "_flow_run_id", lambda: "old")
+    with span("stale"):
+        pass
+    monkeypatch.setattr(ins, "_flow_run_id", lambda: "new")
+    with flow_spans():
+        with span("fresh"):
+            pass
+
+    (_, metrics), = fake_mlflow.batches
+    assert {key for key, _, _ in metrics if key.endswith("_wall_s")} == {"fresh_wall_s"}
+    (run_id, _, _), = ins._pending
+    assert run_id == "old"
+
+
+def test_flow_spans_drops_on_failure_without_mlflow():
+    with pytest.raises(RuntimeError):
+        with flow_spans(log_to_mlflow=False):
+            with span("task"):
+                pass
+            raise RuntimeError("task failed")
+    assert len(ins._pending) == 0
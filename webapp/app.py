@@ -1,5 +1,9 @@
-from flask import Flask, request, jsonify, render_template
-import mlflow.pyfunc, os, json
+from flask import Flask, request, jsonify, render_template, Response, g
+import mlflow.pyfunc, os, json, time
+from prometheus_client import (
+    Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST,
+    generate_latest, multiprocess,
+)
 
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://127.0.0.1:5000")
 MODEL_NAME          = os.getenv("MODEL_NAME", "passcompass_students")
@@ -11,6 +15,48 @@ mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
 print("Loading model…")
 model = mlflow.pyfunc.load_model(model_uri=f"models:/{MODEL_NAME}/{MODEL_STAGE}")
 
+# ---- METRICS ----
+# Exposed on /metrics in Prometheus text format. Under gunicorn, set
+# PROMETHEUS_MULTIPROC_DIR so all workers' samples are aggregated.
+REQUEST_LATENCY = Histogram(
+    "passcompass_request_latency_seconds", "Request latency per route",
+    ["method", "route", "status"],
+)
+INFERENCE_LATENCY = Histogram(
+    "passcompass_inference_latency_seconds", "Time spent in model.predict",
+)
+PAYLOAD_SIZE = Histogram(
+    "passcompass_payload_bytes", "Request / response body size per route",
+    ["route", "direction"],
+    buckets=(64, 256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+
+@app.before_request
+def _start_timer():
+    g.start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    # use the URL rule, not the raw path, to keep label cardinality bounded
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(
+        time.perf_counter() - g.start
+    )
+    # bodiless GETs and streamed responses have no length; don't count them as 0
+    if request.content_length is not None:
+        PAYLOAD_SIZE.labels(route, "in").observe(request.content_length)
+    if response.content_length is not None:
+        PAYLOAD_SIZE.labels(route, "out").observe(response.content_length)
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
 @app.route("/", methods=["GET"])
 def index():
     return render_template("index.html")
@@ -24,7 +70,8 @@ def predict():
     }
     """
     data = request.get_json(force=True)
-    prediction = model.predict([data])[0]            # 0 = Fail / 1 = Pass
+    with INFERENCE_LATENCY.time():
+        prediction = model.predict([data])[0]        # 0 = Fail / 1 = Pass
     #proba      = model.predict_proba([data])[0][1]   # prob of Pass (label 1)
 
     return jsonify({